@@ -1,16 +1,24 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import asyncio
 import base64
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from io import BytesIO
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Import your existing modules
-from data_processor import DataProcessor
+from data_processor import DataProcessor, CSV_CHUNK_BYTES
 from categorizer import ExpenseCategorizer
 from financial_health import FinancialHealthAnalyzer
 from credit_scorer import CreditScorer
+from utils import summarize_amounts
 
 from visualizer import (
     create_pie_chart, 
@@ -22,16 +30,9 @@ from visualizer import (
     create_transaction_volume_chart
 )
 
-# ===== PAGE CONFIGURATION =====
-st.set_page_config(
-    page_title="FinScore - M-PESA Credit Analyzer",
-    page_icon="💰",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# ===== CUSTOM CSS =====
-st.markdown("""
+# ===== STATIC HTML =====
+# Built once at import time and re-emitted verbatim on every rerun
+_STYLE = """
 <style>
     /* Main container styling */
     .main-header {
@@ -122,7 +123,209 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+_HEADER_HTML = """
+<div class="main-header">
+    <h1>💰 FinScore - M-PESA Credit Analyzer</h1>
+    <p>AI-powered financial insights and instant credit scoring from your M-PESA transactions</p>
+</div>
+"""
+
+_WELCOME_HTML = """
+<div style="text-align: center; padding: 3rem;">
+    <img src="https://img.icons8.com/color/96/000000/mpesa.png" width="120">
+    <h2>Welcome to FinScore Analyzer</h2>
+    <p style="color: #666; font-size: 1.2rem; max-width: 600px; margin: 2rem auto;">
+        Upload your M-PESA statement to get instant insights into your financial health,
+        credit score, and loan eligibility.
+    </p>
+    <div style="background: #f8f9fa; padding: 2rem; border-radius: 10px; max-width: 800px; margin: 2rem auto;">
+        <h4>📋 What you'll get:</h4>
+        <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem; margin-top: 1rem;">
+            <div>📊 Financial Dashboard</div>
+            <div>🏦 Credit Score (0-100)</div>
+            <div>💰 Loan Recommendations</div>
+            <div>📈 Spending Analysis</div>
+            <div>🔮 Future Predictions</div>
+            <div>📉 Risk Factors</div>
+        </div>
+    </div>
+</div>
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; color: #666; padding: 1rem;">
+    <p>FinScore Analyzer v1.0 | Powered by Machine Learning | Not real financial advice</p>
+    <p style="font-size: 0.9rem;">© 2026 - Your M-PESA Credit Scoring Solution</p>
+</div>
+"""
+
+# Financial Overview row - rendered as a single element
+_METRIC_TMPL = '<div class="metric-card"><h3>{t}</h3><h2 style="color: {c};">{v}</h2><p style="color: #666;">{s}</p></div>'
+_METRIC_ROW_TMPL = '<div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem;">{cards}</div>'
+
+
+# ===== CACHED HELPERS =====
+@st.cache_resource
+def _get_processor() -> DataProcessor:
+    """Share one DataProcessor across reruns and sessions"""
+    return DataProcessor()
+
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store Amount/Balance as float32 when every value is exact in float32.
+    st.cache_data hands back an unpickled copy of this frame on every rerun,
+    so the smaller columns halve that copy; consumers must accumulate in
+    float64 (summarize_amounts, CreditScorer's to_numpy(dtype=float))
+    """
+    if df is None or df.empty:
+        return df
+    for col in ('Amount', 'Balance'):
+        if col in df.columns:
+            down = pd.to_numeric(df[col], downcast='float')
+            # pandas' float downcast check is approximate - only keep float32 if every value round-trips exactly
+            if np.array_equal(down.to_numpy(dtype='float64'), df[col].to_numpy(dtype='float64'), equal_nan=True):
+                df[col] = down
+    return df
+
+
+@contextmanager
+def _spooled(file_bytes: bytes, suffix: str):
+    """Write uploaded bytes to a temp file, yield its path and remove it afterwards"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(file_bytes)
+    try:
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
+
+
+@st.cache_data(show_spinner=False)
+def _load_statement(file_bytes: bytes, filename: str, kind: str) -> pd.DataFrame:
+    """Parse an uploaded statement once per unique file instead of on every rerun"""
+    processor = _get_processor()
+    if kind == "application/pdf":
+        # Parse from disk page by page so large statements stay within a bounded buffer
+        with _spooled(file_bytes, '.pdf') as path:
+            df = processor.process_pdf_file(path)
+    elif len(file_bytes) > CSV_CHUNK_BYTES:
+        # Large CSVs are memory-mapped from disk rather than parsed from a second in-memory copy
+        with _spooled(file_bytes, '.csv') as path:
+            df = processor.process_csv(path)
+    else:
+        # BytesIO shares the bytes object, so this adds no copy
+        df = processor.process_csv(BytesIO(file_bytes))
+    return _downcast(df)
+
+
+def _hash_frame(d: pd.DataFrame) -> tuple:
+    """Cheap content key for caching on a transaction frame"""
+    return (len(d), tuple(d.columns), pd.util.hash_pandas_object(d, index=True).sum())
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _score(df: pd.DataFrame) -> dict:
+    """Run credit scoring once per unique transaction frame"""
+    return CreditScorer(df).analyze()
+
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _hash_frame})
+def _overview(df: pd.DataFrame) -> tuple:
+    """Transaction count, total income and total expenses in one pass over Amount"""
+    return summarize_amounts(df)
+
+
+# Columns CreditScorer reads; frames without them are not scored speculatively
+_SCORE_COLUMNS = {'Date', 'Amount', 'Balance'}
+
+
+async def _pipeline(file_bytes: bytes, filename: str, kind: str) -> tuple:
+    """
+    Parse the statement off the script thread, then compute the overview while
+    credit scoring runs alongside it, so pressing ANALYZE hits a warm cache.
+    Returns (df, overview)
+    """
+    loop = asyncio.get_running_loop()
+    ctx = get_script_run_ctx()
+    
+    def call(fn, *args):
+        # Worker threads need the script context for st.cache_data and st.error
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+    
+    df = await loop.run_in_executor(None, call, _load_statement, file_bytes, filename, kind)
+    
+    # Only warm the scoring cache for frames that can be scored - st.cache_data
+    # does not cache exceptions, so a failing frame would be re-scored every rerun
+    if df is None:
+        # The processor has already reported the parse error
+        return df, (0, 0.0, 0.0)
+    if df.empty or not _SCORE_COLUMNS.issubset(df.columns):
+        overview = await loop.run_in_executor(None, call, _overview, df)
+        return df, overview
+    
+    overview, _ = await asyncio.gather(
+        loop.run_in_executor(None, call, _overview, df),
+        loop.run_in_executor(None, call, _score, df),
+        return_exceptions=True
+    )
+    # Scoring errors are surfaced by the ANALYZE button; overview errors are not expected
+    if isinstance(overview, BaseException):
+        raise overview
+    return df, overview
+
+
+def _credit_cards_html(score, decision) -> tuple:
+    """Render the credit score and loan decision cards"""
+    # Determine score color
+    if score >= 70:
+        score_color = "#4CAF50"
+    elif score >= 50:
+        score_color = "#FF9800"
+    else:
+        score_color = "#f44336"
+    
+    # Determine badge class
+    if 'APPROVE' in decision['decision']:
+        badge_class = "badge-approve"
+        badge_text = "✅ APPROVED"
+    elif 'CONDITIONAL' in decision['decision']:
+        badge_class = "badge-conditional"
+        badge_text = "⚠️ CONDITIONAL"
+    else:
+        badge_class = "badge-decline"
+        badge_text = "❌ DECLINED"
+    
+    score_html = f"""
+    <div class="score-card" style="background: linear-gradient(135deg, {score_color} 0%, #333 100%);">
+        <h3>Your Credit Score</h3>
+        <div class="score-number">{score}/100</div>
+        <p>Based on your transaction history</p>
+    </div>
+    """
+    decision_html = f"""
+    <div class="score-card" style="background: linear-gradient(135deg, #2196F3 0%, #0D47A1 100%);">
+        <h3>Loan Decision</h3>
+        <div class="score-number" style="font-size: 2.5rem;">{decision['amount']}</div>
+        <p>at {decision['interest']}</p>
+        <div class="{badge_class}" style="display: inline-block; margin-top: 1rem;">{badge_text}</div>
+    </div>
+    """
+    return score_html, decision_html
+
+
+# ===== PAGE CONFIGURATION =====
+st.set_page_config(
+    page_title="FinScore - M-PESA Credit Analyzer",
+    page_icon="💰",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# ===== CUSTOM CSS =====
+st.markdown(_STYLE, unsafe_allow_html=True)
 
 # ===== SIDEBAR =====
 with st.sidebar:
@@ -154,12 +357,7 @@ with st.sidebar:
     st.markdown("v1.0.0")
 
 # ===== MAIN HEADER =====
-st.markdown("""
-<div class="main-header">
-    <h1>💰 FinScore - M-PESA Credit Analyzer</h1>
-    <p>AI-powered financial insights and instant credit scoring from your M-PESA transactions</p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 
 # ===== FILE UPLOAD SECTION =====
 col1, col2, col3 = st.columns([1, 2, 1])
@@ -174,21 +372,19 @@ with col2:
 if uploaded_file is not None:
     # Process the file
     with st.spinner("🔄 Processing your statement... Please wait."):
-        processor = DataProcessor()
-        
-        if uploaded_file.type == "application/pdf":
-            df = processor.process_pdf(uploaded_file)
-        else:
-            df = processor.process_csv(uploaded_file)
-        
-        # Store in session state
-        st.session_state.processed_data = df
-        
-        # Get basic metrics
-        total_transactions = len(df)
-        total_income = df[df['Amount'] > 0]['Amount'].sum() if 'Amount' in df.columns else 0
-        total_expenses = df[df['Amount'] < 0]['Amount'].abs().sum() if 'Amount' in df.columns else 0
-        net_cashflow = total_income - total_expenses
+        # Parse, then compute metrics while credit scoring warms its cache
+        df, (total_transactions, total_income, total_expenses) = asyncio.run(
+            _pipeline(uploaded_file.getvalue(), uploaded_file.name, uploaded_file.type)
+        )
+    
+    # Parsing failed - the processor has shown the error, so render nothing else
+    if df is None:
+        st.stop()
+    
+    # Store in session state
+    st.session_state.processed_data = df
+    
+    net_cashflow = total_income - total_expenses
     
     # Success message
     st.success(f"✅ Successfully processed {total_transactions} transactions!")
@@ -196,44 +392,17 @@ if uploaded_file is not None:
     # ===== METRICS ROW =====
     st.markdown('<div class="section-header">📊 Financial Overview</div>', unsafe_allow_html=True)
     
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>📝 Transactions</h3>
-            <h2>{total_transactions}</h2>
-            <p style="color: #666;">Total count</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>💰 Income</h3>
-            <h2 style="color: #4CAF50;">KES {total_income:,.0f}</h2>
-            <p style="color: #666;">Total received</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>💸 Expenses</h3>
-            <h2 style="color: #f44336;">KES {total_expenses:,.0f}</h2>
-            <p style="color: #666;">Total spent</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        flow_color = "green" if net_cashflow >= 0 else "red"
-        st.markdown(f"""
-        <div class="metric-card">
-            <h3>📈 Net Flow</h3>
-            <h2 style="color: {flow_color};">KES {net_cashflow:,.0f}</h2>
-            <p style="color: #666;">{('Positive' if net_cashflow >= 0 else 'Negative')}</p>
-        </div>
-        """, unsafe_allow_html=True)
+    flow_color = "green" if net_cashflow >= 0 else "red"
+    cards = ''.join(
+        _METRIC_TMPL.format(t=title, c=color, v=value, s=subtitle)
+        for title, color, value, subtitle in (
+            ("📝 Transactions", "inherit", total_transactions, "Total count"),
+            ("💰 Income", "#4CAF50", f"KES {total_income:,.0f}", "Total received"),
+            ("💸 Expenses", "#f44336", f"KES {total_expenses:,.0f}", "Total spent"),
+            ("📈 Net Flow", flow_color, f"KES {net_cashflow:,.0f}", 'Positive' if net_cashflow >= 0 else 'Negative'),
+        )
+    )
+    st.markdown(_METRIC_ROW_TMPL.format(cards=cards), unsafe_allow_html=True)
     
     # ===== CREDIT SCORE SECTION =====
     st.markdown('<div class="section-header">🏦 Credit Analysis</div>', unsafe_allow_html=True)
@@ -244,8 +413,7 @@ if uploaded_file is not None:
         if st.button("🔍 ANALYZE MY CREDIT WORTHINESS", use_container_width=True):
             with st.spinner("🧠 Analyzing transaction patterns..."):
                 try:
-                    scorer = CreditScorer(st.session_state.processed_data)
-                    result = scorer.analyze()
+                    result = _score(st.session_state.processed_data)
                     st.session_state.credit_result = result
                 except Exception as e:
                     st.error(f"Analysis error: {str(e)}")
@@ -265,43 +433,18 @@ if uploaded_file is not None:
         # Score and Decision Row
         col1, col2 = st.columns(2)
         
+        # Card HTML only changes when the score or offer does
+        cards_key = (score, decision['amount'])
+        if st.session_state.get('credit_cards_key') != cards_key:
+            st.session_state.credit_cards = _credit_cards_html(score, decision)
+            st.session_state.credit_cards_key = cards_key
+        score_html, decision_html = st.session_state.credit_cards
+        
         with col1:
-            # Determine score color
-            if score >= 70:
-                score_color = "#4CAF50"
-            elif score >= 50:
-                score_color = "#FF9800"
-            else:
-                score_color = "#f44336"
-            
-            st.markdown(f"""
-            <div class="score-card" style="background: linear-gradient(135deg, {score_color} 0%, #333 100%);">
-                <h3>Your Credit Score</h3>
-                <div class="score-number">{score}/100</div>
-                <p>Based on your transaction history</p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(score_html, unsafe_allow_html=True)
         
         with col2:
-            # Determine badge class
-            if 'APPROVE' in decision['decision']:
-                badge_class = "badge-approve"
-                badge_text = "✅ APPROVED"
-            elif 'CONDITIONAL' in decision['decision']:
-                badge_class = "badge-conditional"
-                badge_text = "⚠️ CONDITIONAL"
-            else:
-                badge_class = "badge-decline"
-                badge_text = "❌ DECLINED"
-            
-            st.markdown(f"""
-            <div class="score-card" style="background: linear-gradient(135deg, #2196F3 0%, #0D47A1 100%);">
-                <h3>Loan Decision</h3>
-                <div class="score-number" style="font-size: 2.5rem;">{decision['amount']}</div>
-                <p>at {decision['interest']}</p>
-                <div class="{badge_class}" style="display: inline-block; margin-top: 1rem;">{badge_text}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(decision_html, unsafe_allow_html=True)
         
         # Message
         st.markdown(f"""
@@ -316,7 +459,7 @@ if uploaded_file is not None:
             
             with col1:
                 st.markdown("#### ⚖️ Risk Factors")
-                risk_factors = [r for r in result['reasons'] if 'risk' in r.lower() or 'low' in r.lower() or 'irregular' in r.lower()]
+                risk_factors = result['risk_reasons']
                 if risk_factors:
                     for factor in risk_factors:
                         st.markdown(f"""
@@ -329,7 +472,7 @@ if uploaded_file is not None:
             
             with col2:
                 st.markdown("#### ✅ Positive Factors")
-                positive_factors = [r for r in result['reasons'] if 'healthy' in r.lower() or 'regular' in r.lower()]
+                positive_factors = result['positive_reasons']
                 if positive_factors:
                     for factor in positive_factors:
                         st.markdown(f"""
@@ -342,41 +485,17 @@ if uploaded_file is not None:
             
             # Technical Features
             st.markdown("#### 📊 Technical Metrics")
-            features_df = pd.DataFrame([
-                {"Metric": k.replace('_', ' ').title(), "Value": f"{v:.2f}" if isinstance(v, float) else str(v)}
-                for k, v in result['features'].items()
-            ])
+            features = result['features']
+            features_df = pd.DataFrame({
+                "Metric": [k.replace('_', ' ').title() for k in features],
+                "Value": [f"{v:.2f}" if isinstance(v, float) else str(v) for v in features.values()],
+            })
             st.dataframe(features_df, use_container_width=True, hide_index=True)
 
 else:
     # Welcome screen when no file uploaded
-    st.markdown("""
-    <div style="text-align: center; padding: 3rem;">
-        <img src="https://img.icons8.com/color/96/000000/mpesa.png" width="120">
-        <h2>Welcome to FinScore Analyzer</h2>
-        <p style="color: #666; font-size: 1.2rem; max-width: 600px; margin: 2rem auto;">
-            Upload your M-PESA statement to get instant insights into your financial health,
-            credit score, and loan eligibility.
-        </p>
-        <div style="background: #f8f9fa; padding: 2rem; border-radius: 10px; max-width: 800px; margin: 2rem auto;">
-            <h4>📋 What you'll get:</h4>
-            <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem; margin-top: 1rem;">
-                <div>📊 Financial Dashboard</div>
-                <div>🏦 Credit Score (0-100)</div>
-                <div>💰 Loan Recommendations</div>
-                <div>📈 Spending Analysis</div>
-                <div>🔮 Future Predictions</div>
-                <div>📉 Risk Factors</div>
-            </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_WELCOME_HTML, unsafe_allow_html=True)
 
 # ===== FOOTER =====
 st.markdown("---")
-st.markdown("""
-<div style="text-align: center; color: #666; padding: 1rem;">
-    <p>FinScore Analyzer v1.0 | Powered by Machine Learning | Not real financial advice</p>
-    <p style="font-size: 0.9rem;">© 2026 - Your M-PESA Credit Scoring Solution</p>
-</div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
\ No newline at end of file
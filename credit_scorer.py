@@ -3,17 +3,80 @@ Credit Scoring Model for M-PESA Transactions
 Turns transaction patterns into loan decisions
 """
 
+import re
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+# Currency prefix, thousands separators and whitespace in amount strings
+_CLEAN_RE = re.compile(r'[KSh,\s]+')
+
+# Description patterns in priority order - the first match wins
+_TYPE_PATTERNS = (
+    ('Income', r'salary|income|deposit'),
+    ('Payment', r'pay|payment|till'),
+    ('Withdraw', r'withdraw|cash'),
+    ('Send', r'send|sent|transfer'),
+    ('Airtime', r'airtime'),
+)
+
+# Fixed category order so TransactionType codes are stable
+_TYPE_CATEGORIES = ['Unknown', 'Airtime', 'Send', 'Withdraw', 'Payment', 'Income']
+AIRTIME_CODE = _TYPE_CATEGORIES.index('Airtime')
+INCOME_CODE = _TYPE_CATEGORIES.index('Income')
+
+# int64 views of datetime64[ns] values
+NS_PER_DAY = 86_400_000_000_000
+NAT = np.iinfo(np.int64).min
+
+# Score bands per feature: (feature, default, thresholds, side, deltas, reasons).
+# np.searchsorted maps a value onto its band - side='left' treats thresholds as
+# exclusive lower bounds (value > t), side='right' as inclusive (value >= t).
+# Reasons are (category, message) pairs, tagged 'positive' or 'risk', or None.
+_RISK = 'risk'
+_POSITIVE = 'positive'
+_SCORE_BANDS = (
+    # Average Daily Balance (up to +20)
+    ('avg_daily_balance', 0, np.array([1000, 5000, 10000, 20000, 50000]), 'left',
+     np.array([0, 2, 5, 10, 15, 20]),
+     (None, None, None, None, None, None)),
+    # Income Regularity (lower std = better, up to +20)
+    ('income_regularity', 999, np.array([3, 7, 15]), 'right',
+     np.array([20, 15, 5, -10]),
+     ((_POSITIVE, "Very regular income pattern"), (_POSITIVE, "Regular income pattern"),
+      (_POSITIVE, "Somewhat regular income"), (_RISK, "Irregular income - risk factor"))),
+    # Night Transactions (penalty up to -20)
+    ('night_ratio', 0, np.array([0.05, 0.15, 0.3]), 'left',
+     np.array([0, -5, -10, -20]),
+     (None, None, (_RISK, "Moderate night activity"), (_RISK, "High night activity - potential risk"))),
+    # Airtime Purchases (stability, up to +10)
+    ('airtime_ratio', 0, np.array([0.05, 0.1]), 'left',
+     np.array([0, 5, 10]),
+     (None, None, (_POSITIVE, "Regular airtime purchases - stable behavior"))),
+    # Rounded Amounts (gambling risk, penalty up to -15)
+    ('rounded_ratio', 0, np.array([0.2, 0.4]), 'left',
+     np.array([0, -10, -15]),
+     (None, (_RISK, "Some rounded amounts"), (_RISK, "Many rounded amounts - possible gambling"))),
+    # Low Balance Frequency (penalty up to -15)
+    ('low_balance_ratio', 0, np.array([0.15, 0.3]), 'left',
+     np.array([0, -8, -15]),
+     (None, None, (_RISK, "Frequently low balance - cash flow issues"))),
+    # Transaction Frequency (too many or too few; 3-8 per day is the Goldilocks zone)
+    ('txns_per_day', 2, np.array([0.5, 3, np.nextafter(8, np.inf), np.nextafter(15, np.inf)]), 'right',
+     np.array([-5, 0, 10, 0, -10]),
+     ((_RISK, "Low account activity"), None, (_POSITIVE, "Healthy transaction activity"), None,
+      (_RISK, "Very high transaction volume - business?"))),
+)
+
 class CreditScorer:
     def __init__(self, df):
         """
         Initialize with transaction dataframe
         df should have columns: Date, Amount, Balance, TransactionType
+        The caller's dataframe is never mutated - only a shallow view is kept and
+        any column that gets cleaned or added is re-bound on that view
         """
-        self.df = df.copy()
+        self.df = df.copy(deep=False)
         self.score = 50  # Start neutral
         self.features = {}
         self.reasons = []
@@ -22,153 +85,113 @@ class CreditScorer:
         """Convert dates and prepare the dataframe"""
         # Convert Date column to datetime
         if 'Date' in self.df.columns:
-            self.df['Date'] = pd.to_datetime(self.df['Date'])
+            self.df = self.df.assign(Date=pd.to_datetime(self.df['Date']))
         
         # Extract hour from time if available
         if 'Time' in self.df.columns:
-            self.df['Hour'] = pd.to_datetime(self.df['Time'], format='%H:%M').dt.hour
-        else:
-            self.df['Hour'] = 12  # Default if no time
+            self.df['Hour'] = pd.to_datetime(self.df['Time'], format='%H:%M', cache=True).dt.hour
+        # Without a Time column hours default to noon via hours(), not a frame column
             
-        # Clean amount (remove KSh, commas)
-        if 'Amount' in self.df.columns:
-            self.df['Amount'] = self.df['Amount'].astype(str).str.replace('[KSh,\s]', '', regex=True)
-            self.df['Amount'] = pd.to_numeric(self.df['Amount'], errors='coerce')
-            
-        # Clean balance
-        if 'Balance' in self.df.columns:
-            self.df['Balance'] = self.df['Balance'].astype(str).str.replace('[KSh,\s]', '', regex=True)
-            self.df['Balance'] = pd.to_numeric(self.df['Balance'], errors='coerce')
+        # Clean amount and balance (remove KSh, commas) unless already numeric
+        for col in ('Amount', 'Balance'):
+            if col in self.df.columns and not pd.api.types.is_numeric_dtype(self.df[col]):
+                cleaned = self.df[col].astype(str).str.replace(_CLEAN_RE, '', regex=True)
+                self.df = self.df.assign(**{col: pd.to_numeric(cleaned, errors='coerce')})
             
         # Identify transaction types
         if 'TransactionType' not in self.df.columns:
             # Try to infer from description
-            self.df['TransactionType'] = 'Unknown'
             if 'Description' in self.df.columns:
-                desc = self.df['Description'].str.lower()
-                self.df.loc[desc.str.contains('airtime', na=False), 'TransactionType'] = 'Airtime'
-                self.df.loc[desc.str.contains('send|sent|transfer', na=False), 'TransactionType'] = 'Send'
-                self.df.loc[desc.str.contains('withdraw|cash', na=False), 'TransactionType'] = 'Withdraw'
-                self.df.loc[desc.str.contains('pay|payment|till', na=False), 'TransactionType'] = 'Payment'
-                self.df.loc[desc.str.contains('salary|income|deposit', na=False), 'TransactionType'] = 'Income'
+                desc = self.df['Description'].str.lower().fillna('')
+                masks = [desc.str.contains(pattern, regex=True) for _, pattern in _TYPE_PATTERNS]
+                labels = [label for label, _ in _TYPE_PATTERNS]
+                self.df['TransactionType'] = np.select(masks, labels, default='Unknown')
+            else:
+                self.df['TransactionType'] = 'Unknown'
+        
+        # Fixed categories so features can compare int8 codes instead of strings
+        self.df['TransactionType'] = pd.Categorical(self.df['TransactionType'], categories=_TYPE_CATEGORIES)
                 
-    def calculate_features(self):
-        """Extract all predictive features from transaction data"""
+    def hours(self):
+        """Hour of each transaction as int8, defaulting to 12 when there is no Time column or value"""
+        if 'Hour' in self.df.columns:
+            return self.df['Hour'].fillna(12).to_numpy(dtype=np.int8)
+        return np.full(len(self.df), 12, dtype=np.int8)
+    
+    def calculate_features(self, hour=None):
+        """
+        Extract all predictive features from transaction data
+        hour: per-row hours as an ndarray, taken from hours() when omitted
+        """
+        if hour is None:
+            hour = self.hours()
         
-        # 1. Average Daily Balance
-        daily_balance = self.df.groupby(self.df['Date'].dt.date)['Balance'].last()
-        self.features['avg_daily_balance'] = daily_balance.mean()
+        # 1. Average Daily Balance (last known balance of each day)
+        d = self.df['Date'].to_numpy(dtype='datetime64[D]')
+        bal = self.df['Balance'].to_numpy(dtype=float)
+        valid = ~(np.isnat(d) | np.isnan(bal))
+        d, day_bal = d[valid], bal[valid]
+        if not (d[1:] >= d[:-1]).all():
+            order = d.argsort(kind='stable')
+            d, day_bal = d[order], day_bal[order]
+        if d.size:
+            last_idx = np.r_[np.flatnonzero(d[1:] != d[:-1]), d.size - 1]
+            self.features['avg_daily_balance'] = float(day_bal[last_idx].mean())
+        else:
+            self.features['avg_daily_balance'] = np.nan
+        
+        codes = self.df['TransactionType'].cat.codes.to_numpy()
         
         # 2. Income Regularity (std deviation between income transactions)
-        income_txns = self.df[self.df['TransactionType'] == 'Income']
-        if len(income_txns) > 1:
-            income_dates = income_txns['Date'].sort_values()
-            day_diffs = income_dates.diff().dt.days.dropna()
-            self.features['income_regularity'] = day_diffs.std()
+        idx = np.flatnonzero(codes == INCOME_CODE)
+        if idx.size > 1:
+            dates_ns = self.df['Date'].to_numpy(dtype='datetime64[ns]').view(np.int64)[idx]
+            dates_ns = dates_ns[dates_ns != NAT]
+            dates_ns.sort()
+            day_diffs = np.diff(dates_ns) // NS_PER_DAY  # whole days, like Timedelta.days
+            self.features['income_regularity'] = float(day_diffs.std(ddof=1)) if day_diffs.size > 1 else np.nan
         else:
             self.features['income_regularity'] = 999  # Very irregular if no income pattern
             
-        # 3. Night Transaction Ratio
-        night_txns = self.df[self.df['Hour'].between(22, 5) | self.df['Hour'].between(0, 5)]
-        self.features['night_ratio'] = len(night_txns) / max(len(self.df), 1)
+        # 3. Night Transaction Ratio (22:00 - 05:59)
+        n = hour.size
+        self.features['night_ratio'] = float(((hour >= 22) | (hour <= 5)).sum()) / max(n, 1)
         
         # 4. Airtime Ratio (stability indicator)
-        airtime_txns = self.df[self.df['TransactionType'] == 'Airtime']
-        self.features['airtime_ratio'] = len(airtime_txns) / max(len(self.df), 1)
+        self.features['airtime_ratio'] = float((codes == AIRTIME_CODE).sum()) / max(n, 1)
         
-        # 5. Rounded Amount Ratio (gambling indicator)
-        self.df['is_rounded'] = self.df['Amount'] % 100 == 0
-        self.features['rounded_ratio'] = self.df['is_rounded'].mean()
+        # 5. Rounded Amount Ratio (gambling indicator) - low balances (#7) are
+        # counted in the same sweep over the numeric columns
+        amt = self.df['Amount'].to_numpy(dtype=float)
+        rounded = np.count_nonzero(np.mod(amt, 100) == 0)
+        low_bal = np.count_nonzero(bal < 500)
+        self.features['rounded_ratio'] = rounded / max(n, 1)
         
         # 6. Transaction Frequency
         date_range = (self.df['Date'].max() - self.df['Date'].min()).days
         self.features['txns_per_day'] = len(self.df) / max(date_range, 1)
         
         # 7. Low Balance Frequency
-        low_balance = self.df[self.df['Balance'] < 500]
-        self.features['low_balance_ratio'] = len(low_balance) / max(len(self.df), 1)
+        self.features['low_balance_ratio'] = low_bal / max(n, 1)
         
         return self.features
     
     def calculate_score(self):
         """Convert features to a credit score (0-100)"""
         score = 50  # Base score
+        feats = self.features
+        reasons = []
         
-        # Feature 1: Average Daily Balance (up to +20)
-        avg_bal = self.features.get('avg_daily_balance', 0)
-        if avg_bal > 50000:
-            score += 20
-        elif avg_bal > 20000:
-            score += 15
-        elif avg_bal > 10000:
-            score += 10
-        elif avg_bal > 5000:
-            score += 5
-        elif avg_bal > 1000:
-            score += 2
-            
-        # Feature 2: Income Regularity (lower std = better, up to +20)
-        income_std = self.features.get('income_regularity', 999)
-        if income_std < 3:  # Less than 3 days variation
-            score += 20
-            self.reasons.append("Very regular income pattern")
-        elif income_std < 7:  # Weekly pattern
-            score += 15
-            self.reasons.append("Regular income pattern")
-        elif income_std < 15:
-            score += 5
-            self.reasons.append("Somewhat regular income")
-        else:
-            score -= 10
-            self.reasons.append("Irregular income - risk factor")
-            
-        # Feature 3: Night Transactions (penalty up to -20)
-        night_ratio = self.features.get('night_ratio', 0)
-        if night_ratio > 0.3:  # More than 30% at night
-            score -= 20
-            self.reasons.append("High night activity - potential risk")
-        elif night_ratio > 0.15:
-            score -= 10
-            self.reasons.append("Moderate night activity")
-        elif night_ratio > 0.05:
-            score -= 5
-            
-        # Feature 4: Airtime Purchases (stability, up to +10)
-        airtime_ratio = self.features.get('airtime_ratio', 0)
-        if airtime_ratio > 0.1:
-            score += 10
-            self.reasons.append("Regular airtime purchases - stable behavior")
-        elif airtime_ratio > 0.05:
-            score += 5
-            
-        # Feature 5: Rounded Amounts (gambling risk, penalty up to -15)
-        rounded_ratio = self.features.get('rounded_ratio', 0)
-        if rounded_ratio > 0.4:
-            score -= 15
-            self.reasons.append("Many rounded amounts - possible gambling")
-        elif rounded_ratio > 0.2:
-            score -= 10
-            self.reasons.append("Some rounded amounts")
-            
-        # Feature 6: Low Balance Frequency (penalty up to -15)
-        low_ratio = self.features.get('low_balance_ratio', 0)
-        if low_ratio > 0.3:
-            score -= 15
-            self.reasons.append("Frequently low balance - cash flow issues")
-        elif low_ratio > 0.15:
-            score -= 8
-            
-        # Feature 7: Transaction Frequency (too many or too few)
-        txn_freq = self.features.get('txns_per_day', 2)
-        if 3 <= txn_freq <= 8:
-            score += 10  # Goldilocks zone
-            self.reasons.append("Healthy transaction activity")
-        elif txn_freq > 15:
-            score -= 10
-            self.reasons.append("Very high transaction volume - business?")
-        elif txn_freq < 0.5:
-            score -= 5
-            self.reasons.append("Low account activity")
+        for name, default, thresholds, side, deltas, band_reasons in _SCORE_BANDS:
+            value = feats.get(name, default)
+            if pd.isna(value):
+                value = default  # NaN fails every comparison, same band as the default
+            band = int(np.searchsorted(thresholds, value, side=side))
+            score += int(deltas[band])
+            if band_reasons[band] is not None:
+                reasons.append(band_reasons[band])
+        
+        self.reasons.extend(reasons)
             
         # Ensure score is between 0-100
         self.score = max(0, min(100, round(score, 1)))
@@ -228,5 +251,7 @@ class CreditScorer:
             'score': score,
             'recommendation': recommendation,
             'features': self.features,
-            'reasons': self.reasons
-        }
\ No newline at end of file
+            'reasons': [message for _, message in self.reasons],
+            'risk_reasons': [message for category, message in self.reasons if category == _RISK],
+            'positive_reasons': [message for category, message in self.reasons if category == _POSITIVE]
+        }
@@ -1,10 +1,29 @@
 import pandas as pd
 import pdfplumber
+import pyarrow as pa
+import pyarrow.parquet as pq
+import gc
 import io
+import os
 import re
+import tempfile
 from datetime import datetime
 import streamlit as st
 
+# CSVs larger than this (roughly 100k statement rows) are read in chunks
+CSV_CHUNK_BYTES = 20 * 1024 * 1024
+CSV_CHUNK_ROWS = 50000
+
+# Column layout of rows produced by the PDF text/table parsers
+PDF_ROW_SCHEMA = pa.schema([
+    ('Date', pa.timestamp('us')),
+    ('Details', pa.string()),
+    ('Amount', pa.float64()),
+    ('Balance', pa.float64()),
+    ('Receipt', pa.string()),
+    ('Type', pa.string()),
+])
+
 class DataProcessor:
     def __init__(self):
         self.column_mappings = {
@@ -18,7 +37,7 @@ class DataProcessor:
         }
     
     def process_csv(self, uploaded_file):
-        """Process CSV M-Pesa statement"""
+        """Process CSV M-Pesa statement from an uploaded file object or a path on disk"""
         try:
             # Try different encodings
             encodings = ['utf-8', 'latin-1', 'cp1252']
@@ -26,8 +45,7 @@ class DataProcessor:
             
             for encoding in encodings:
                 try:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, encoding=encoding)
+                    df = self._read_csv(uploaded_file, encoding)
                     break
                 except UnicodeDecodeError:
                     continue
@@ -52,6 +70,46 @@ class DataProcessor:
             st.error(f"Error processing CSV: {str(e)}")
             return None
     
+    def _read_csv(self, source, encoding):
+        """
+        Read CSV with Arrow's multithreaded parser, chunking very large files.
+        `source` is a file-like object or a path; paths are memory-mapped.
+        """
+        is_path = isinstance(source, (str, os.PathLike))
+        if is_path:
+            size = os.path.getsize(source)
+        else:
+            source.seek(0, io.SEEK_END)
+            size = source.tell()
+            source.seek(0)
+        
+        if size > CSV_CHUNK_BYTES:
+            chunks = pd.read_csv(source, encoding=encoding, engine='c', low_memory=False,
+                                 memory_map=is_path, chunksize=CSV_CHUNK_ROWS)
+            return pd.concat(chunks, ignore_index=True)
+        
+        try:
+            df = pd.read_csv(source, encoding=encoding, engine='pyarrow')
+            # Arrow keeps undecodable text as raw bytes instead of raising
+            if not any(self._is_bytes_column(df[col]) for col in df.columns):
+                return df
+        except UnicodeDecodeError:
+            raise
+        except Exception:
+            pass
+        
+        # Arrow is stricter (ragged rows, undecodable bytes) - retry with the C parser
+        if not is_path:
+            source.seek(0)
+        return pd.read_csv(source, encoding=encoding)
+    
+    def _is_bytes_column(self, series):
+        """Whether Arrow returned this column as undecoded binary"""
+        if series.dtype != object:
+            return False
+        first = series.first_valid_index()
+        return first is not None and isinstance(series[first], bytes)
+    
     def process_pdf(self, uploaded_file):
         """Process PDF M-Pesa statement"""
         try:
@@ -62,20 +120,7 @@ class DataProcessor:
             
             with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
                 for page in pdf.pages:
-                    # Extract text from page
-                    text = page.extract_text()
-                    
-                    if text:
-                        # Also try to extract tables if available
-                        tables = page.extract_tables()
-                        if tables:
-                            for table in tables:
-                                table_transactions = self._parse_pdf_table(table)
-                                transactions.extend(table_transactions)
-                        
-                        # Parse transactions from text
-                        page_transactions = self._parse_pdf_text(text)
-                        transactions.extend(page_transactions)
+                    transactions.extend(self._parse_pdf_page(page))
             
             if not transactions:
                 raise ValueError("No transactions found in PDF")
@@ -92,6 +137,84 @@ class DataProcessor:
             st.error(f"Error processing PDF: {str(e)}")
             return None
     
+    def process_pdf_file(self, pdf_path, batch_rows=5000):
+        """Process a PDF M-Pesa statement on disk with bounded memory"""
+        # Create the shard here so the finally below always cleans it up
+        fd, shard_path = tempfile.mkstemp(suffix='.parquet')
+        os.close(fd)
+        try:
+            self.stream_pdf_to_parquet(pdf_path, shard_path=shard_path, batch_rows=batch_rows)
+            df = pd.read_parquet(shard_path)
+            
+            if df.empty:
+                raise ValueError("No transactions found in PDF")
+            
+            # Clean and process the data
+            df = self._clean_data(df)
+            
+            return df
+            
+        except Exception as e:
+            st.error(f"Error processing PDF: {str(e)}")
+            return None
+        finally:
+            if os.path.exists(shard_path):
+                os.remove(shard_path)
+    
+    def stream_pdf_to_parquet(self, pdf_path, shard_path=None, batch_rows=5000):
+        """
+        Parse a PDF statement page by page, flushing every `batch_rows` parsed
+        rows to a Parquet shard so only one batch is held in memory at a time.
+        Returns the path of the shard; a temp shard created here is removed if parsing fails.
+        """
+        created = shard_path is None
+        if created:
+            fd, shard_path = tempfile.mkstemp(suffix='.parquet')
+            os.close(fd)
+        
+        try:
+            buffer = []
+            with pq.ParquetWriter(shard_path, PDF_ROW_SCHEMA) as writer:
+                with pdfplumber.open(pdf_path) as pdf:
+                    for page in pdf.pages:
+                        buffer.extend(self._parse_pdf_page(page))
+                        page.close()  # Drop pdfplumber's cached layout objects
+                        
+                        if len(buffer) >= batch_rows:
+                            writer.write_table(pa.Table.from_pylist(buffer, schema=PDF_ROW_SCHEMA))
+                            buffer = []
+                            gc.collect()
+                
+                # Always write the tail so the shard has a schema even when empty
+                writer.write_table(pa.Table.from_pylist(buffer, schema=PDF_ROW_SCHEMA))
+        except Exception:
+            if created and os.path.exists(shard_path):
+                os.remove(shard_path)
+            raise
+        
+        return shard_path
+    
+    def _parse_pdf_page(self, page):
+        """Extract transactions from a single PDF page (tables first, then text)"""
+        transactions = []
+        
+        # Extract text from page
+        text = page.extract_text()
+        
+        if text:
+            # Also try to extract tables if available
+            tables = page.extract_tables()
+            if tables:
+                for table in tables:
+                    table_transactions = self._parse_pdf_table(table)
+                    transactions.extend(table_transactions)
+            
+            # Parse transactions from text
+            page_transactions = self._parse_pdf_text(text)
+            transactions.extend(page_transactions)
+        
+        return transactions
+    
     def _parse_pdf_text(self, text):
         """Parse transaction data from PDF text"""
         transactions = []
@@ -350,6 +473,24 @@ class DataProcessor:
         else:
             return 'Other'
     
+    def _parse_dates(self, dates):
+        """
+        Parse statement dates the same way whatever the reader inferred:
+        year-first strings (M-Pesa's "2025-07-01 19:47:53") are ISO 8601,
+        anything else is day-first ("01/07/2025")
+        """
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            return dates.astype('datetime64[ns]')
+        
+        text = dates.astype(str).str.strip()
+        iso = text.str.match(r'^\d{4}-')
+        parsed = pd.Series(pd.NaT, index=dates.index, dtype='datetime64[ns]')
+        if iso.any():
+            parsed[iso] = pd.to_datetime(text[iso], errors='coerce', format='ISO8601')
+        if (~iso).any():
+            parsed[~iso] = pd.to_datetime(text[~iso], errors='coerce', dayfirst=True)
+        return parsed
+    
     def _clean_data(self, df):
         """Clean and standardize the data"""
         if df is None or df.empty:
@@ -364,7 +505,7 @@ class DataProcessor:
         
         # Clean Date column
         if 'Date' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'], errors='coerce', dayfirst=True)
+            df['Date'] = self._parse_dates(df['Date'])
             df = df.dropna(subset=['Date'])
         
         # Clean Amount column
@@ -0,0 +1,115 @@
+"""
+Test script to verify CreditScorer features, score bands and input handling
+"""
+
+import pandas as pd
+from credit_scorer import CreditScorer
+
+# Score with every feature at its default: 50 base - 10 for no income pattern
+DEFAULT_SCORE = 40
+
+def make_statement(times, descriptions=None):
+    """Build a small statement with one transaction per time"""
+    n = len(times)
+    return pd.DataFrame({
+        'Date': [f"2024-01-{i + 1:02d}" for i in range(n)],
+        'Time': times,
+        'Amount': ["KSh 1,050"] * n,
+        'Balance': ["5,000"] * n,
+        'Description': descriptions or ["Misc"] * n,
+    })
+
+def score_for(**features):
+    """Score a scorer whose features are set directly"""
+    scorer = CreditScorer(pd.DataFrame())
+    scorer.features = dict(features)
+    return scorer.calculate_score()
+
+def test_night_hours():
+    """22:00-05:59 counts as night, everything else does not"""
+    print("🧪 Testing night-hour ratio...")
+    df = make_statement(["22:15", "23:59", "00:30", "05:59", "06:00", "12:00", "21:59", "14:00"])
+    features = CreditScorer(df).analyze()['features']
+    assert features['night_ratio'] == 4 / 8, features['night_ratio']
+
+    # A missing time defaults to noon rather than midnight
+    df = make_statement(["10:00", None, "14:00"])
+    features = CreditScorer(df).analyze()['features']
+    assert features['night_ratio'] == 0.0, features['night_ratio']
+    print("   ✅ Hours 22-23 and 0-5 count as night; missing times do not")
+    return True
+
+def test_type_precedence():
+    """When several patterns match, Income > Payment > Withdraw > Send > Airtime"""
+    print("🧪 Testing transaction type precedence...")
+    descriptions = [
+        "Salary payment",           # income + pay
+        "Pay cash at till",         # pay + cash
+        "Cash sent to agent",       # cash + sent
+        "Airtime transfer",         # send + airtime
+        "Airtime top up",
+        "Something else",
+    ]
+    scorer = CreditScorer(make_statement(["12:00"] * len(descriptions), descriptions))
+    scorer.prepare_data()
+    types = list(scorer.df['TransactionType'].astype(str))
+    assert types == ['Income', 'Payment', 'Withdraw', 'Send', 'Airtime', 'Unknown'], types
+    print(f"   ✅ {types}")
+    return True
+
+def test_score_bands():
+    """Score at each band threshold matches the original if/elif ladders"""
+    print("🧪 Testing score band thresholds...")
+    cases = [
+        # (feature, value, delta from the default score)
+        ('avg_daily_balance', 1000, 0), ('avg_daily_balance', 1001, 2),
+        ('avg_daily_balance', 5000, 2), ('avg_daily_balance', 5001, 5),
+        ('avg_daily_balance', 10000, 5), ('avg_daily_balance', 10001, 10),
+        ('avg_daily_balance', 20000, 10), ('avg_daily_balance', 20001, 15),
+        ('avg_daily_balance', 50000, 15), ('avg_daily_balance', 50001, 20),
+        ('income_regularity', 2.9, 30), ('income_regularity', 3, 25),
+        ('income_regularity', 7, 15), ('income_regularity', 15, 0),
+        ('income_regularity', float('nan'), 0),
+        ('night_ratio', 0.05, 0), ('night_ratio', 0.06, -5),
+        ('night_ratio', 0.15, -5), ('night_ratio', 0.16, -10),
+        ('night_ratio', 0.3, -10), ('night_ratio', 0.31, -20),
+        ('airtime_ratio', 0.05, 0), ('airtime_ratio', 0.06, 5),
+        ('airtime_ratio', 0.1, 5), ('airtime_ratio', 0.11, 10),
+        ('rounded_ratio', 0.2, 0), ('rounded_ratio', 0.21, -10),
+        ('rounded_ratio', 0.4, -10), ('rounded_ratio', 0.41, -15),
+        ('low_balance_ratio', 0.15, 0), ('low_balance_ratio', 0.16, -8),
+        ('low_balance_ratio', 0.3, -8), ('low_balance_ratio', 0.31, -15),
+        ('txns_per_day', 0.49, -5), ('txns_per_day', 0.5, 0),
+        ('txns_per_day', 2.9, 0), ('txns_per_day', 3, 10),
+        ('txns_per_day', 8, 10), ('txns_per_day', 8.01, 0),
+        ('txns_per_day', 15, 0), ('txns_per_day', 15.01, -10),
+    ]
+    for feature, value, delta in cases:
+        score = score_for(**{feature: value})
+        assert score == DEFAULT_SCORE + delta, (feature, value, score, DEFAULT_SCORE + delta)
+    print(f"   ✅ {len(cases)} threshold cases match")
+    return True
+
+def test_input_not_mutated():
+    """analyze() leaves the caller's dataframe untouched"""
+    print("🧪 Testing that the input frame is not mutated...")
+    df = make_statement(["09:00", "23:00", "13:30"], ["Salary", "Airtime", "Pay till"])
+    original = df.copy()
+    CreditScorer(df).analyze()
+    pd.testing.assert_frame_equal(df, original)
+    print("   ✅ Columns and values unchanged")
+    return True
+
+if __name__ == "__main__":
+    print("🚀 CREDIT SCORER TEST\n")
+
+    night_test = test_night_hours()
+    type_test = test_type_precedence()
+    band_test = test_score_bands()
+    mutation_test = test_input_not_mutated()
+
+    print(f"\n📊 TEST RESULTS:")
+    print(f"Night hours: {'✅ PASS' if night_test else '❌ FAIL'}")
+    print(f"Type precedence: {'✅ PASS' if type_test else '❌ FAIL'}")
+    print(f"Score bands: {'✅ PASS' if band_test else '❌ FAIL'}")
+    print(f"Input not mutated: {'✅ PASS' if mutation_test else '❌ FAIL'}")
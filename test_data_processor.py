@@ -0,0 +1,66 @@
+"""
+Test script to verify CSV statements load identically on the Arrow and chunked paths
+"""
+
+import io
+import pandas as pd
+from datetime import datetime, timedelta
+
+import data_processor
+from data_processor import DataProcessor
+
+def create_iso_statement(rows=500):
+    """Create an M-Pesa style CSV with ISO completion times (many days above 12)"""
+    start = datetime(2024, 1, 1)
+    lines = ["Completion Time,Details,Paid In,Balance"]
+    for i in range(rows):
+        when = start + timedelta(hours=17 * i)
+        lines.append(f"{when:%Y-%m-%d %H:%M:%S},Payment {i},{i * 10 + 5},{1000 + i}")
+    return ("\n".join(lines) + "\n").encode()
+
+def read_both_paths(data):
+    """Process the same bytes through the Arrow path and the chunked C-engine path"""
+    processor = DataProcessor()
+    small = processor.process_csv(io.BytesIO(data))
+
+    original_threshold = data_processor.CSV_CHUNK_BYTES
+    data_processor.CSV_CHUNK_BYTES = 0  # Force the chunked path
+    try:
+        chunked = processor.process_csv(io.BytesIO(data))
+    finally:
+        data_processor.CSV_CHUNK_BYTES = original_threshold
+
+    return small, chunked
+
+def test_csv_paths_match():
+    """Both CSV read paths keep every row and produce the same frame"""
+    print("🧪 Testing CSV read paths on an ISO-dated statement...")
+    small, chunked = read_both_paths(create_iso_statement())
+
+    assert len(small) == 500, f"Arrow path kept {len(small)} of 500 rows"
+    assert len(chunked) == 500, f"Chunked path kept {len(chunked)} of 500 rows"
+    pd.testing.assert_frame_equal(small, chunked)
+    print(f"   ✅ Both paths kept {len(small)} rows with identical data")
+    return True
+
+def test_day_first_dates():
+    """Slash dates are still read day-first"""
+    print("🧪 Testing day-first statement dates...")
+    data = b"Completion Time,Details,Paid In\n13/02/2024 10:00,Airtime,5\n01/03/2024 09:00,Salary,6\n"
+    small, chunked = read_both_paths(data)
+
+    expected = [datetime(2024, 2, 13, 10, 0), datetime(2024, 3, 1, 9, 0)]
+    assert list(small['Date']) == expected, list(small['Date'])
+    assert list(chunked['Date']) == expected, list(chunked['Date'])
+    print("   ✅ 13/02/2024 and 01/03/2024 parsed as 13 Feb and 1 Mar")
+    return True
+
+if __name__ == "__main__":
+    print("🚀 DATA PROCESSOR CSV PATH TEST\n")
+
+    paths_test = test_csv_paths_match()
+    dates_test = test_day_first_dates()
+
+    print(f"\n📊 TEST RESULTS:")
+    print(f"CSV paths match: {'✅ PASS' if paths_test else '❌ FAIL'}")
+    print(f"Day-first dates: {'✅ PASS' if dates_test else '❌ FAIL'}")
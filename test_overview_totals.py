@@ -0,0 +1,46 @@
+"""
+Test script to verify Financial Overview totals are exact for downcast Amount columns
+"""
+
+import numpy as np
+import pandas as pd
+from utils import summarize_amounts
+
+def create_whole_shilling_statement(rows, seed=42):
+    """Random whole-shilling amounts, the kind the loader stores as float32"""
+    rng = np.random.default_rng(seed)
+    amounts = rng.integers(-50000, 50000, rows).astype(np.float64)
+    return pd.DataFrame({'Amount': amounts})
+
+def test_downcast_totals_match():
+    """A float32 Amount column sums to the same totals as its float64 original"""
+    print("🧪 Testing overview totals on downcast amounts...")
+    for rows in (2000, 10000, 50000):
+        original = create_whole_shilling_statement(rows)
+        downcast = original.assign(Amount=pd.to_numeric(original['Amount'], downcast='float'))
+        assert downcast['Amount'].dtype == np.float32, downcast['Amount'].dtype
+
+        expected = summarize_amounts(original)
+        actual = summarize_amounts(downcast)
+        assert actual == expected, (rows, actual, expected)
+        print(f"   ✅ {rows} rows: income KES {actual[1]:,.0f}, expenses KES {actual[2]:,.0f}")
+    return True
+
+def test_no_expenses():
+    """Statements without outgoing transactions report zero expenses"""
+    print("🧪 Testing a statement with no expenses...")
+    count, income, expenses = summarize_amounts(pd.DataFrame({'Amount': [100.0, 250.0]}))
+    assert (count, income, expenses) == (2, 350.0, 0.0), (count, income, expenses)
+    assert not np.signbit(expenses), "expenses rendered as -0"
+    print("   ✅ Expenses are 0")
+    return True
+
+if __name__ == "__main__":
+    print("🚀 OVERVIEW TOTALS TEST\n")
+
+    downcast_test = test_downcast_totals_match()
+    empty_test = test_no_expenses()
+
+    print(f"\n📊 TEST RESULTS:")
+    print(f"Downcast totals: {'✅ PASS' if downcast_test else '❌ FAIL'}")
+    print(f"No expenses: {'✅ PASS' if empty_test else '❌ FAIL'}")
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import io
 from datetime import datetime
 
@@ -8,6 +9,14 @@ def export_to_csv(df: pd.DataFrame) -> str:
     df.to_csv(output, index=False)
     return output.getvalue()
 
+def summarize_amounts(df: pd.DataFrame) -> tuple:
+    """Transaction count, total income and total expenses from the Amount column"""
+    if 'Amount' not in df.columns:
+        return len(df), 0.0, 0.0
+    # Accumulate in float64 even when Amount is stored as float32
+    a = df['Amount'].to_numpy(dtype=np.float64)
+    return len(df), float(a[a > 0].sum()), float(np.abs(a[a < 0]).sum())
+
 def export_summary_to_pdf(summary_data: dict) -> bytes:
     """Export summary data to PDF (placeholder implementation)"""
     # This is a placeholder - you would implement actual PDF generation here